@@ -23,5 +23,5 @@ except (ImportError, AttributeError):
 
 # --- Export the main function ---
 # This line will only be reached if the check above passes.
-from .border import remove_border, extract_panel_content
+from .border import remove_border, remove_borders_batch, extract_panel_content
 from .layout import sort_panels_by_column_then_row
\ No newline at end of file
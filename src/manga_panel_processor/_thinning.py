@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+
+# Zhang-Suen and Guo-Hall thinning types, matching cv2.ximgproc's constants
+THINNING_ZHANGSUEN = 0
+THINNING_GUOHALL = 1
+
+# The rewritten, much faster cv2.ximgproc.thinning ships with OpenCV 4.10 and later
+_FAST_THINNING_VERSION = (4, 10)
+
+
+def _opencv_version() -> tuple:
+    """
+    Parses the (major, minor) version of the installed OpenCV build.
+    """
+    parts = cv2.__version__.split(".")
+    try:
+        return int(parts[0]), int(parts[1])
+    except (IndexError, ValueError):
+        return 0, 0
+
+
+def _build_lookup_tables() -> dict:
+    """
+    Precomputes the deletion predicate of each thinning sub-iteration for all 256
+    possible 8-neighborhoods.
+
+    The neighborhood code packs the neighbors clockwise starting from north:
+    bit 0 = P2 (N), bit 1 = P3 (NE), bit 2 = P4 (E), bit 3 = P5 (SE),
+    bit 4 = P6 (S), bit 5 = P7 (SW), bit 6 = P8 (W), bit 7 = P9 (NW).
+
+    Returns:
+    - A dict mapping (thinning_type, sub_iteration) to a 256-entry boolean table.
+    """
+    tables = {key: np.zeros(256, dtype=bool) for key in
+              [(THINNING_ZHANGSUEN, 0), (THINNING_ZHANGSUEN, 1),
+               (THINNING_GUOHALL, 0), (THINNING_GUOHALL, 1)]}
+
+    for code in range(256):
+        p2, p3, p4, p5, p6, p7, p8, p9 = [(code >> bit) & 1 for bit in range(8)]
+
+        # --- Zhang-Suen ---
+        sequence = [p2, p3, p4, p5, p6, p7, p8, p9, p2]
+        transitions = sum(1 for a, b in zip(sequence, sequence[1:]) if a == 0 and b == 1)
+        neighbors = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+        if transitions == 1 and 2 <= neighbors <= 6:
+            tables[(THINNING_ZHANGSUEN, 0)][code] = p2 * p4 * p6 == 0 and p4 * p6 * p8 == 0
+            tables[(THINNING_ZHANGSUEN, 1)][code] = p2 * p4 * p8 == 0 and p2 * p6 * p8 == 0
+
+        # --- Guo-Hall ---
+        connectivity = ((not p2 and (p3 or p4)) + (not p4 and (p5 or p6)) +
+                        (not p6 and (p7 or p8)) + (not p8 and (p9 or p2)))
+        n1 = (p9 or p2) + (p3 or p4) + (p5 or p6) + (p7 or p8)
+        n2 = (p2 or p3) + (p4 or p5) + (p6 or p7) + (p8 or p9)
+        if connectivity == 1 and 2 <= min(n1, n2) <= 3:
+            tables[(THINNING_GUOHALL, 0)][code] = not ((p6 or p7 or not p9) and p8)
+            tables[(THINNING_GUOHALL, 1)][code] = not ((p2 or p3 or not p5) and p4)
+
+    return tables
+
+
+_LOOKUP_TABLES = _build_lookup_tables()
+
+
+def _thinning_lut(src: np.ndarray, thinningType: int = THINNING_ZHANGSUEN) -> np.ndarray:
+    """
+    A NumPy port of cv2.ximgproc.thinning driven by a 256-entry lookup table.
+
+    Every sub-iteration packs the 8-neighborhood of all interior pixels into one
+    byte with shifted views of the image, then looks up the deletion predicate,
+    so the per-pixel work has no Python-level branches. Like OpenCV, the outermost
+    rows and columns are never modified.
+
+    Parameters:
+    - src: A single-channel binary image (non-zero pixels are foreground).
+    - thinningType: THINNING_ZHANGSUEN or THINNING_GUOHALL.
+
+    Returns:
+    - The single-pixel-wide skeleton as a uint8 image with values 0 and 255.
+    """
+    img = (src != 0).astype(np.uint8)
+    if img.shape[0] < 3 or img.shape[1] < 3:
+        return img * 255
+
+    center = img[1:-1, 1:-1]
+    # Shifted views of the neighbors, in the bit order used by the lookup tables
+    neighbors = [
+        img[:-2, 1:-1],  # P2 (N)
+        img[:-2, 2:],    # P3 (NE)
+        img[1:-1, 2:],   # P4 (E)
+        img[2:, 2:],     # P5 (SE)
+        img[2:, 1:-1],   # P6 (S)
+        img[2:, :-2],    # P7 (SW)
+        img[1:-1, :-2],  # P8 (W)
+        img[:-2, :-2],   # P9 (NW)
+    ]
+    code = np.empty(center.shape, dtype=np.uint8)
+
+    changed = True
+    while changed:
+        changed = False
+        for sub_iteration in (0, 1):
+            code.fill(0)
+            for bit, neighbor in enumerate(neighbors):
+                code |= neighbor << bit
+            marker = _LOOKUP_TABLES[(thinningType, sub_iteration)][code] & (center == 1)
+            if marker.any():
+                center[marker] = 0
+                changed = True
+
+    return img * 255
+
+
+# Prefer OpenCV's own implementation when it is the rewritten, faster version
+try:
+    if _opencv_version() < _FAST_THINNING_VERSION:
+        raise ImportError("cv2.ximgproc.thinning predates the faster rewrite")
+    from cv2.ximgproc import thinning
+except (ImportError, AttributeError):
+    thinning = _thinning_lut
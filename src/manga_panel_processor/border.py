@@ -1,64 +1,116 @@
+import threading
 import cv2
 import numpy as np
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import List, Optional, Tuple
 
-# Ensure the thinning function is available
+# Uses cv2.ximgproc.thinning on OpenCV >= 4.10, otherwise a bundled lookup-table port
+from ._thinning import thinning
+
+# Optional: compile the border line scoring loop with Numba when it is installed
 try:
-    # Attempt to import the thinning function from the contrib module
-    from cv2.ximgproc import thinning
+    from numba import njit
 except ImportError:
-    # If opencv-contrib-python is not installed, print a warning and provide a dummy function
-    print("Warning: cv2.ximgproc.thinning not found. Border removal might be less effective.")
-    print("Please install 'opencv-contrib-python' via 'pip install opencv-contrib-python'")
-    def thinning(src, thinningType=None): # Dummy function to prevent crashes
-        return src
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _scored_argmax(projection, start, stop, step):
+        """
+        Fused weighted-projection scoring and argmax over range(start, stop, step).
+        Scores are the same integers as the vectorized path, and later indices win ties.
+        """
+        total_span = abs(stop - start)
+        best_score, best_index = -1, start
+        for i in range(start, stop, step):
+            score = projection[i] * (total_span + abs(i - start))
+            if score >= best_score:
+                best_score, best_index = score, i
+        return best_index
+else:
+    _scored_argmax = None
+
+# Structuring element for the hollow ring erosion, built once instead of per panel
+_EROSION_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (11, 11))
+
+
+@lru_cache(maxsize=None)
+def _erosion_kernel(scale: int) -> np.ndarray:
+    """
+    Returns the hollow ring erosion kernel for a mask downscaled by `scale`.
+    The ring is at least 5 original pixels thick, rounded up to whole mask pixels, so its
+    skeleton stays about as close to the panel's outer edge as at full resolution.
+    """
+    if scale == 1:
+        return _EROSION_KERNEL
+    ring = -(-5 // scale)  # ceil(5 / scale)
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (2 * ring + 1, 2 * ring + 1))
+
+class _Scratch(threading.local):
+    """
+    Per-thread uint8 scratch buffers for the border pipeline, reused across panels.
+    Panels cropped from the same page tend to share sizes, so reusing the buffers through
+    OpenCV's dst= parameter avoids reallocating them on every call.
+    """
+
+    def get(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Returns the buffer called `name`, reallocating it only if its shape changed.
+        The contents are left over from the previous use.
+        """
+        buffer = self.__dict__.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self.__dict__[name] = buffer
+        return buffer
 
 
-def _find_best_border_line(roi_mask: np.ndarray, axis: int, scan_range: range) -> int:
+_SCRATCH = _Scratch()
+
+
+def _find_best_border_line(projection: np.ndarray, scan_range: range) -> int:
     """
     A helper function to find the best border line along a single axis.
     It scans from the inside-out and returns the index of the line with the highest score.
 
     Parameters:
-    - roi_mask: The skeletonized mask of the panel's border area.
-    - axis: The axis to scan along (0 for vertical, 1 for horizontal).
+    - projection: The per-row or per-column count of skeleton pixels in the panel's border area.
     - scan_range: The range of indices to scan (defines direction and search zone).
 
     Returns:
     - The index of the most likely border line.
     """
-    best_index, max_score = scan_range.start, -1
-    
     # The total span of the search, used for normalizing the position weight.
     total_span = abs(scan_range.stop - scan_range.start)
     if total_span == 0:
-        return best_index
+        return scan_range.start
 
-    for i in scan_range:
-        # Calculate continuity score based on the scan axis
-        if axis == 1: # Horizontal scan (for top/bottom borders)
-            continuity_score = np.count_nonzero(roi_mask[i, :])
-        else: # Vertical scan (for left/right borders)
-            continuity_score = np.count_nonzero(roi_mask[:, i])
-            
-        # Position weight increases as we move from the start (inner) to the end (outer) of the range.
-        # This prioritizes lines closer to the physical edge of the panel.
-        progress = abs(i - scan_range.start)
-        position_weight = progress / total_span
-        
-        # Combine scores
-        score = continuity_score * (1 + position_weight)
-        
-        # Update if we found a better candidate
-        if score >= max_score:
-            max_score, best_index = score, i
-            
-    return best_index
+    if _scored_argmax is not None:
+        return int(_scored_argmax(projection, scan_range.start, scan_range.stop, scan_range.step))
+
+    indices = np.arange(scan_range.start, scan_range.stop, scan_range.step)
+
+    # Position weight increases as we move from the start (inner) to the end (outer) of the range.
+    # This prioritizes lines closer to the physical edge of the panel. The score
+    # continuity * (1 + progress / total_span) is scaled by total_span to stay in integers,
+    # so equal scores compare exactly equal.
+    position_weights = total_span + np.abs(indices - scan_range.start)
+
+    # Combine scores
+    scores = projection[indices] * position_weights
+
+    # On ties, prefer the outermost candidate: distinct integer scores differ by at least 1,
+    # so adding the scan position to the scores scaled by their count is an exact bias
+    # toward later indices that lets a plain argmax pick the last maximum.
+    best = int(np.argmax(scores * len(scores) + np.arange(len(scores))))
+    return int(indices[best])
 
 
 def remove_border(panel_image: np.ndarray, 
                   search_zone_ratio: float = 0.25, 
-                  padding: int = 5) -> np.ndarray:
+                  padding: int = 5,
+                  use_skeleton: bool = True) -> np.ndarray:
     """
     Removes borders using skeletonization and weighted projection analysis.
     This definitive version accurately finds the innermost border line by reducing
@@ -70,14 +122,51 @@ def remove_border(panel_image: np.ndarray,
     - search_zone_ratio: The percentage of the panel's width/height from the edge
                          to define the search area for a border (e.g., 0.25 = 25%).
     - padding: Pixels to add inside the final detected border to avoid clipping art.
+    - use_skeleton: If False, near-rectangular panels skip skeletonization and are scored
+                    on the hollow contour ring directly, which is much faster.
 
     Returns:
     - The cropped panel image, or the original if processing fails.
     """
-    cropped, _ = extract_panel_content(panel_image, search_zone_ratio, padding)
+    cropped, _ = extract_panel_content(panel_image, search_zone_ratio, padding, use_skeleton)
         
     return cropped
 
+
+def remove_borders_batch(panels: List[np.ndarray],
+                         workers: Optional[int] = None,
+                         search_zone_ratio: float = 0.25,
+                         padding: int = 5,
+                         use_skeleton: bool = True) -> List[np.ndarray]:
+    """
+    Removes borders from many panels in parallel using a process pool.
+    Panels are scheduled largest first so the slowest ones start early and the
+    work is balanced across processes.
+    On platforms that start workers by spawning (Windows, and macOS by default), the
+    calling script is re-imported in each worker, so call this from inside an
+    `if __name__ == "__main__":` block.
+
+    Parameters:
+    - panels: The input panel images.
+    - workers: The number of worker processes (defaults to the number of CPUs).
+    - search_zone_ratio, padding, use_skeleton: Passed through to remove_border.
+
+    Returns:
+    - The cropped panel images, in the same order as the input.
+    """
+    order = sorted(range(len(panels)), key=lambda i: -panels[i].size)
+    results = [None] * len(panels)
+
+    process_panel = partial(remove_border,
+                            search_zone_ratio=search_zone_ratio,
+                            padding=padding,
+                            use_skeleton=use_skeleton)
+    with ProcessPoolExecutor(workers) as executor:
+        for i, cropped in zip(order, executor.map(process_panel, (panels[i] for i in order))):
+            results[i] = cropped
+
+    return results
+
 # --- Define Type Aliases for clarity ---
 # Create an alias for the coordinate tuple
 Coordinate = Tuple[int, int, int, int]
@@ -87,7 +176,8 @@ PanelContent = Tuple[np.ndarray, Coordinate]
 
 def extract_panel_content(panel_image: np.ndarray, 
                   search_zone_ratio: float = 0.25, 
-                  padding: int = 5) -> PanelContent:
+                  padding: int = 5,
+                  use_skeleton: bool = True) -> PanelContent:
     """
     Removes borders and returns the content area along with its coordinates.
     This definitive version accurately finds the innermost border line by reducing
@@ -99,6 +189,8 @@ def extract_panel_content(panel_image: np.ndarray,
     - search_zone_ratio: The percentage of the panel's width/height from the edge
                          to define the search area for a border (e.g., 0.25 = 25%).
     - padding: Pixels to add inside the final detected border to avoid clipping art.
+    - use_skeleton: If False, near-rectangular panels skip skeletonization and are scored
+                    on the hollow contour ring directly, which is much faster.
 
     Returns:
     - A tuple containing:
@@ -115,17 +207,32 @@ def extract_panel_content(panel_image: np.ndarray,
         return panel_image, (0, 0, w_orig, h_orig)
 
     # --- 1. Preparation ---
-    # Add a safe, white border to separate the panel's border from the image edge
+    # Convert to grayscale and binarize to highlight non-white areas
+    gray = cv2.cvtColor(panel_image, cv2.COLOR_BGR2GRAY, dst=_SCRATCH.get("gray", (h_orig, w_orig)))
+    _, thresh = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV,
+                              dst=_SCRATCH.get("thresh", (h_orig, w_orig)))
+
+    # Border localization only needs a few pixels of accuracy, so large panels are
+    # analyzed at a reduced resolution. The detected coordinates are scaled back up.
+    # The binary mask (not the image) is shrunk with a block maximum, so even a 1-pixel
+    # light line keeps marking its block as non-white.
     pad_size = 15
-    padded_image = cv2.copyMakeBorder(
-        panel_image, pad_size, pad_size, pad_size, pad_size,
-        cv2.BORDER_CONSTANT, value=[255, 255, 255]
+    scale = max(1, (min(h_orig, w_orig) + 2 * pad_size) // 512)
+    if scale > 1:
+        # Anchored at the top-left, the dilation stores each scale x scale block's maximum
+        # at the block's first pixel, which the subsampling then picks
+        block_max = cv2.dilate(thresh, np.ones((scale, scale), np.uint8), anchor=(0, 0))
+        thresh = np.ascontiguousarray(block_max[::scale, ::scale])
+    mask_shape = thresh.shape
+
+    # Add a safe, empty (white) border to separate the panel's border from the image edge.
+    # Only the single-channel mask is padded; the color image is never copied.
+    thresh = cv2.copyMakeBorder(
+        thresh, pad_size, pad_size, pad_size, pad_size,
+        cv2.BORDER_CONSTANT, value=0,
+        dst=_SCRATCH.get("padded", (mask_shape[0] + 2 * pad_size, mask_shape[1] + 2 * pad_size))
     )
     
-    # Convert to grayscale and binarize to highlight non-white areas
-    gray = cv2.cvtColor(padded_image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-    
     # Find the outermost contour, which should now be the panel itself
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -138,20 +245,30 @@ def extract_panel_content(panel_image: np.ndarray,
     x, y, w, h = cv2.boundingRect(largest_contour)
 
     # --- 2. Create Skeletonized Mask ---
-    # Create a mask by filling the largest contour
-    filled_mask = np.zeros_like(gray)
-    cv2.drawContours(filled_mask, [largest_contour], -1, 255, cv2.FILLED)
-    
+    # Fill the largest contour into a mask covering only the Region of Interest (ROI), so filling,
+    # erosion and skeletonization only process the panel's area. A 1-pixel empty margin is kept
+    # around the bounding box so these operations still see the panel's outer edge.
+    roi_shape = (h + 2, w + 2)
+    roi_filled = _SCRATCH.get("filled", roi_shape)
+    roi_filled.fill(0)
+    cv2.drawContours(roi_filled, [largest_contour], -1, 255, cv2.FILLED, offset=(1 - x, 1 - y))
+
     # Create a hollow version of the contour to provide a clean input for skeletonization.
-    # Use a fixed number of erosion iterations to define the thickness of the hollow ring.
-    erosion_iterations = 5 
-    hollow_contour = cv2.subtract(filled_mask, cv2.erode(filled_mask, np.ones((3,3), np.uint8), iterations=erosion_iterations))
+    # A single erosion with an 11x11 kernel is equivalent to five 3x3 iterations and
+    # defines the thickness of the hollow ring in one pass.
+    roi_eroded = cv2.erode(roi_filled, _erosion_kernel(scale), dst=_SCRATCH.get("eroded", roi_shape))
+    roi_hollow = cv2.subtract(roi_filled, roi_eroded, dst=_SCRATCH.get("hollow", roi_shape))
     
-    # Perform skeletonization to reduce varied-thickness lines to a single-pixel-wide skeleton
-    skeleton = thinning(hollow_contour)
-    
-    # Crop the skeleton mask to the Region of Interest (ROI) for analysis
-    roi_mask = skeleton[y:y+h, x:x+w]
+    # A panel that fills at least 90% of its bounding box is treated as rectangular. Its hollow
+    # ring has no thickness bias worth removing, so the skeletonization step can be skipped.
+    if not use_skeleton and cv2.contourArea(largest_contour) > 0.9 * w * h:
+        roi_mask = roi_hollow
+    else:
+        # Perform skeletonization to reduce varied-thickness lines to a single-pixel-wide skeleton
+        roi_mask = thinning(roi_hollow)
+
+    # Drop the margin so the mask is aligned with the ROI for analysis
+    roi_mask = roi_mask[1:-1, 1:-1]
 
     # --- 3. Find Borders using the Helper Function ---
     # Define search zones and scan ranges for each border
@@ -166,50 +283,48 @@ def extract_panel_content(panel_image: np.ndarray,
     left_range = range(left_search_end, -1, -1)
     right_range = range(right_search_start, w)
     
+    # Project the mask once per axis; the continuity score of a row (top/bottom
+    # borders) or column (left/right borders) is its count of skeleton pixels.
+    row_counts = np.count_nonzero(roi_mask, axis=1)
+    col_counts = np.count_nonzero(roi_mask, axis=0)
+
     # Call the common function for each border
     
     # --- Find Top Border ---
-    best_top_y = _find_best_border_line(roi_mask, axis=1, scan_range=top_range)
+    best_top_y = _find_best_border_line(row_counts, scan_range=top_range)
     # --- Find Bottom Border ---
-    best_bottom_y = _find_best_border_line(roi_mask, axis=1, scan_range=bottom_range)
+    best_bottom_y = _find_best_border_line(row_counts, scan_range=bottom_range)
     # --- Find Left Border ---
-    best_left_x = _find_best_border_line(roi_mask, axis=0, scan_range=left_range)
+    best_left_x = _find_best_border_line(col_counts, scan_range=left_range)
     # --- Find Right Border ---
-    best_right_x = _find_best_border_line(roi_mask, axis=0, scan_range=right_range)
+    best_right_x = _find_best_border_line(col_counts, scan_range=right_range)
 
     # --- 4. Final Cropping ---
-    # Convert relative ROI coordinates back to the global coordinates of the padded image and apply padding
-    final_x1 = x + best_left_x + padding
-    final_y1 = y + best_top_y + padding
-    final_x2 = x + best_right_x - padding
-    final_y2 = y + best_bottom_y - padding
+    # Convert relative ROI coordinates back to the coordinates of the original panel_image
+    # (removing the mask padding) and apply padding. When downscaled, each detected line
+    # covers a block of `scale` original pixels. The block's first pixel already bounds
+    # the right/bottom lines from the inside, but the left/top lines may reach the block's
+    # last pixel, so only they get the extra `scale - 1` margin.
+    final_x1 = (x + best_left_x - pad_size) * scale + scale - 1 + padding
+    final_y1 = (y + best_top_y - pad_size) * scale + scale - 1 + padding
+    final_x2 = (x + best_right_x - pad_size) * scale - padding
+    final_y2 = (y + best_bottom_y - pad_size) * scale - padding
+
+    # Clamp values to be within the original image's bounds to prevent errors
+    final_x1, final_x2 = max(0, final_x1), min(w_orig, final_x2)
+    final_y1, final_y2 = max(0, final_y1), min(h_orig, final_y2)
     
     # If the calculated coordinates are invalid, return the original image
     if final_x1 >= final_x2 or final_y1 >= final_y2: 
         return panel_image, (0, 0, w_orig, h_orig)
         
-    # Crop the final result from the padded image
-    cropped = padded_image[final_y1:final_y2, final_x1:final_x2]
+    # Crop the final result directly from the original image
+    cropped = panel_image[final_y1:final_y2, final_x1:final_x2]
     
     # Perform a final check to ensure the cropped image is not too small
     if cropped.shape[0] < 10 or cropped.shape[1] < 10: 
         return panel_image, (0, 0, w_orig, h_orig)
-    
-    # Calculate coordinates relative to the ORIGINAL panel_image
-    # We subtract the padding that was initially added.
-    content_x = final_x1 - pad_size
-    content_y = final_y1 - pad_size
-    content_w = final_x2 - final_x1
-    content_h = final_y2 - final_y1
-
-    # Clamp values to be within the original image's bounds to prevent errors
-    content_x = max(0, content_x)
-    content_y = max(0, content_y)
-    if content_x + content_w > w_orig:
-        content_w = w_orig - content_x
-    if content_y + content_h > h_orig:
-        content_h = h_orig - content_y
         
-    content_coords = (content_x, content_y, content_w, content_h)
+    content_coords = (final_x1, final_y1, final_x2 - final_x1, final_y2 - final_y1)
         
     return cropped, content_coords
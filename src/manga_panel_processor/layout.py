@@ -1,3 +1,4 @@
+import heapq
 import cv2
 import numpy as np
 
@@ -17,23 +18,21 @@ def sort_panels_by_column_then_row(items, rtl_order: bool) -> list:
         return []
 
     # Step 1: gather panel data and measure full width
-    data = []  # List of tuples: (item, x_center, y_top, x, y, w, h)
-    max_x2 = 0
-    for item in items:
-        if isinstance(item, np.ndarray):
-            x, y, w, h = cv2.boundingRect(item)
-        else:
-            x, y, w, h = item
-        max_x2 = max(max_x2, x + w)
-        data.append((item, x + w / 2, y, x, y, w, h))
-    full_width = max_x2
+    # Stack all bounding boxes into an (N, 4) array of (x, y, w, h) rows
+    rects = np.array([cv2.boundingRect(item) if isinstance(item, np.ndarray) else tuple(item)
+                      for item in items])
+    centers = rects[:, 0] + rects[:, 2] / 2
+    full_width = max(0, (rects[:, 0] + rects[:, 2]).max().item())
+
+    # List of tuples: (item, x_center, y_top, x, y, w, h)
+    data = [(item, xc, y, x, y, w, h)
+            for item, xc, (x, y, w, h) in zip(items, centers.tolist(), rects.tolist())]
 
     # Step 2: separate spanning panels (width >= 60% of full page)
-    spanning = [d for d in data if d[5] >= full_width * 0.6]
-    
-    # Use id() to avoid ambiguous ndarray comparison
-    spanning_ids = set(id(d[0]) for d in spanning)
-    remaining = [d for d in data if id(d[0]) not in spanning_ids]
+    # A single boolean mask avoids comparing tuples (and their ndarray items) against each other
+    is_spanning = (rects[:, 2] >= full_width * 0.6).tolist()
+    spanning = [d for d, span in zip(data, is_spanning) if span]
+    remaining = [d for d, span in zip(data, is_spanning) if not span]
 
     # If too few non-spanning, treat all as non-spanning
     if len(remaining) < 2:
@@ -41,20 +40,23 @@ def sort_panels_by_column_then_row(items, rtl_order: bool) -> list:
         spanning = []
 
     # Step 3: find split_x using remaining panels
-    remaining.sort(key=lambda d: d[1])  # sort by x_center
-    x_centers = [d[1] for d in remaining]
+    x_centers = np.fromiter((d[1] for d in remaining), dtype=np.float64, count=len(remaining))
+    order = np.argsort(x_centers, kind="stable")  # sort by x_center
+    remaining = [remaining[i] for i in order]
+    x_centers = x_centers[order]
 
     # fallback: if only one panel remains, split_x = its center
     if len(x_centers) < 2:
         split_x = x_centers[0]  # just use the only x_center
     else:
-        gaps = [(x_centers[i + 1] - x_centers[i], i) for i in range(len(x_centers) - 1)]
-        split_idx = max(gaps, key=lambda g: g[0])[1]
+        split_idx = int(np.argmax(np.diff(x_centers)))  # largest gap between neighbors
         split_x = (x_centers[split_idx] + x_centers[split_idx + 1]) / 2
 
     # Step 4: divide remaining into left/right
-    left_group = [d for d in remaining if d[1] < split_x]
-    right_group = [d for d in remaining if d[1] >= split_x]
+    # remaining is already sorted by x_center, so the groups are its two slices
+    split_pos = int(np.searchsorted(x_centers, split_x, side="left"))  # count of x_center < split_x
+    left_group = remaining[:split_pos]
+    right_group = remaining[split_pos:]
 
     # Step 5: set column order
     columns = [left_group, right_group] if not rtl_order else [right_group, left_group]
@@ -67,18 +69,7 @@ def sort_panels_by_column_then_row(items, rtl_order: bool) -> list:
     # Step 7: sort spanning by y_top
     spanning_sorted = sorted(spanning, key=lambda d: d[2])
 
-    # Step 8: merge lists by y_top
-    merged = []
-    i = j = 0
-    while i < len(non_spanning) and j < len(spanning_sorted):
-        if spanning_sorted[j][2] < non_spanning[i][2]:
-            merged.append(spanning_sorted[j][0])
-            j += 1
-        else:
-            merged.append(non_spanning[i][0])
-            i += 1
-    # append leftovers
-    merged.extend([d[0] for d in non_spanning[i:]])
-    merged.extend([d[0] for d in spanning_sorted[j:]])
+    # Step 8: merge lists by y_top (on ties, non-spanning panels come first)
+    merged = [d[0] for d in heapq.merge(non_spanning, spanning_sorted, key=lambda d: d[2])]
 
     return merged